@@ -1,20 +1,26 @@
 python
 import os
 import io
+import glob
+import json
+import hashlib
 import time
 import asyncio
 import sqlite3
+import threading
+import traceback
 import datetime as dt
+from contextlib import contextmanager
 from typing import Dict, Any, List, Tuple, Optional
 
 import httpx
+import numpy as np
 import pandas as pd
 import pytz
 from dotenv import load_dotenv
 
 import discord
 from discord import app_commands
-from discord.ext import tasks
 
 # ========= CONFIG =========
 load_dotenv()
@@ -40,6 +46,13 @@ CACHE_DIR = ".cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
 CACHE_TTL_HOURS = 12
 
+# Parsed DataFrames kept in memory, keyed by URL: url -> (loaded_at, frame)
+_DF_CACHE: Dict[str, Tuple[float, pd.DataFrame]] = {}
+_DF_TTL = 600  # seconds
+
+# Shared HTTP client (keep-alive pool), opened in setup_hook and closed with the bot
+_HTTP: Optional[httpx.AsyncClient] = None
+
 # Default scoring configs
 SCORING_PRESETS = {
     "PPR": {"receptions": 1.0, "pass_yd": 0.04, "pass_td": 4.0, "int": -2.0,
@@ -50,6 +63,20 @@ SCORING_PRESETS = {
             "rush_yd": 0.1, "rush_td": 6.0, "rec_yd": 0.1, "rec_td": 6.0, "fumbles_lost": -2.0}
 }
 
+# Stat columns used for fantasy scoring -> their key in SCORING_PRESETS
+FP_STAT_KEYS = {"receptions": "receptions", "passing_yards": "pass_yd", "passing_tds": "pass_td",
+                "interceptions": "int", "rushing_yards": "rush_yd", "rushing_tds": "rush_td",
+                "receiving_yards": "rec_yd", "receiving_tds": "rec_td", "fumbles_lost": "fumbles_lost"}
+FP_STAT_COLUMNS = list(FP_STAT_KEYS)
+
+# Columns (and dtypes) parsed from each CSV; everything else is skipped at read time.
+# Low-cardinality strings are categoricals so masks and lookups compare int codes.
+PLAYER_STATS_DTYPES = {"season": "int16", "season_type": "category", "week": "int16", "player_id": "str",
+                       "player_name": "category", "team": "category", **{c: "float32" for c in FP_STAT_COLUMNS}}
+SNAP_COUNTS_DTYPES = {"season": "int16", "week": "int16", "team": "category", "player": "category",
+                      "pfr_player_id": "str", "offense_pct": "float32"}
+PLAYERS_DTYPES = {"gsis_id": "str", "pfr_id": "str"}
+
 # ========= DISCORD CLIENT =========
 intents = discord.Intents.default()
 intents.guilds = True
@@ -58,140 +85,287 @@ class BetBot(discord.Client):
     def __init__(self):
         super().__init__(intents=intents)
         self.tree = app_commands.CommandTree(self)
+        # GSIS <-> PFR id map; only changes with roster moves, so loaded once per session
+        self.players_map: Optional[pd.DataFrame] = None
 
     async def setup_hook(self):
+        global _HTTP
+        _HTTP = httpx.AsyncClient(
+            timeout=60,
+            follow_redirects=True,
+            http2=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+        )
+        self.players_task = asyncio.create_task(self.preload_players_map())
+        self.weekly_task = asyncio.create_task(weekly_runner())
         if GUILD_ID:
             self.tree.copy_global_to(guild=discord.Object(id=int(GUILD_ID)))
             await self.tree.sync(guild=discord.Object(id=int(GUILD_ID)))
         else:
             await self.tree.sync()
 
+    async def preload_players_map(self):
+        """Warm the id map in the background so startup never waits on players.csv."""
+        try:
+            self.players_map = await load_players_map()
+        except (httpx.HTTPError, OSError, ValueError):
+            traceback.print_exc()  # retried on first use by build_season_frame
+
+    async def close(self):
+        # Stop background tasks before the client and DB they use are closed
+        for task in (getattr(self, "players_task", None), getattr(self, "weekly_task", None)):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if _HTTP is not None:
+            await _HTTP.aclose()
+        await super().close()
+        with _LOCK:
+            _CON.close()
+
 bot = BetBot()
 
 # ========= PERSISTENCE =========
 DB = "bets.sqlite"
 
+# One connection for the bot's lifetime (autocommit; writes go through db_write); _LOCK serializes access to it.
+# Never hold _LOCK across an await.
+_CON = sqlite3.connect(DB, check_same_thread=False, isolation_level=None)
+_LOCK = threading.Lock()
+
+@contextmanager
+def db_write():
+    """Hold _LOCK and run the block's writes as one BEGIN IMMEDIATE ... COMMIT (rolled back on error)."""
+    with _LOCK:
+        _CON.execute("BEGIN IMMEDIATE")
+        try:
+            yield _CON
+        except BaseException:
+            _CON.execute("ROLLBACK")
+            raise
+        _CON.execute("COMMIT")
+
 def db_init():
-    con = sqlite3.connect(DB)
-    cur = con.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS bets(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        creator_discord_id TEXT NOT NULL,
-        player_a TEXT NOT NULL,
-        player_b TEXT NOT NULL,
-        description TEXT,
-        scoring TEXT NOT NULL,
-        min_snap_pct REAL NOT NULL,
-        season INTEGER NOT NULL,
-        start_week INTEGER DEFAULT 1,
-        end_week INTEGER DEFAULT 18,
-        participants TEXT DEFAULT '',
-        is_active INTEGER DEFAULT 1,
-        created_at TEXT NOT NULL
-    )
-    """)
-    # Safe migration if existing DB lacks participants column
-    try:
-        cur.execute("SELECT participants FROM bets LIMIT 1")
-    except sqlite3.OperationalError:
-        cur.execute("ALTER TABLE bets ADD COLUMN participants TEXT DEFAULT ''")
-    con.commit()
-    con.close()
+    _CON.execute("PRAGMA journal_mode=WAL")
+    _CON.execute("PRAGMA synchronous=NORMAL")
+    with db_write() as con:
+        cur = con.cursor()
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS bets(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            creator_discord_id TEXT NOT NULL,
+            player_a TEXT NOT NULL,
+            player_b TEXT NOT NULL,
+            description TEXT,
+            scoring TEXT NOT NULL,
+            min_snap_pct REAL NOT NULL,
+            season INTEGER NOT NULL,
+            start_week INTEGER DEFAULT 1,
+            end_week INTEGER DEFAULT 18,
+            participants TEXT DEFAULT '',
+            is_active INTEGER DEFAULT 1,
+            created_at TEXT NOT NULL
+        )
+        """)
+        # Safe migration if existing DB lacks participants column
+        try:
+            cur.execute("SELECT participants FROM bets LIMIT 1")
+        except sqlite3.OperationalError:
+            cur.execute("ALTER TABLE bets ADD COLUMN participants TEXT DEFAULT ''")
+        # Indexes matching close_completed_bets/standings and mybets lookups
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_bets_active ON bets(season, is_active, end_week)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_bets_creator ON bets(creator_discord_id, season)")
 
 db_init()
 
 # ========= DATA LAYER =========
-async def fetch_csv(url: str, cache_name: str) -> pd.DataFrame:
-    """Fetch CSV with naive caching."""
+def _parquet_path(cache_path: str, dtype: Optional[Dict[str, str]] = None) -> str:
+    """Parquet sidecar for a cached CSV, named after the column/dtype spec it was parsed with."""
+    spec = json.dumps(dtype, sort_keys=True).encode()
+    return f"{cache_path}.{hashlib.sha1(spec).hexdigest()[:8]}.parquet"
+
+def _write_parquet(df: pd.DataFrame, cache_path: str, dtype: Optional[Dict[str, str]] = None) -> None:
+    """Write a columnar sidecar of a parsed CSV; skipped if pyarrow can't type a column."""
+    parquet_path = _parquet_path(cache_path, dtype)
+    # Drop sidecars left by other (older) column/dtype specs for the same CSV
+    for stale in glob.glob(glob.escape(cache_path) + ".*parquet"):
+        if stale != parquet_path:
+            os.remove(stale)
+    try:
+        df.to_parquet(parquet_path, compression="zstd")
+    except (TypeError, ValueError):
+        if os.path.exists(parquet_path):
+            os.remove(parquet_path)
+
+def _parse_csv(source, dtype: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Parse only the columns named in dtype (absent ones are skipped), already typed."""
+    if dtype is None:
+        return pd.read_csv(source)
+    return pd.read_csv(source, usecols=lambda c: c in dtype, dtype=dtype)
+
+def _read_cached(cache_path: str, dtype: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Load a cached CSV, preferring its Parquet sidecar when it is up to date."""
+    parquet_path = _parquet_path(cache_path, dtype)
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(cache_path):
+        return pd.read_parquet(parquet_path)
+    df = _parse_csv(cache_path, dtype)
+    _write_parquet(df, cache_path, dtype)
+    return df
+
+def _read_validators(cache_path: str) -> Dict[str, str]:
+    """ETag / Last-Modified saved alongside a cached CSV (empty if none)."""
+    try:
+        with open(cache_path + ".etag") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_validators(cache_path: str, headers: httpx.Headers) -> None:
+    validators = {}
+    if headers.get("etag"):
+        validators["etag"] = headers["etag"]
+    if headers.get("last-modified"):
+        validators["last_modified"] = headers["last-modified"]
+    with open(cache_path + ".etag", "w") as f:
+        json.dump(validators, f)
+
+async def fetch_csv(url: str, cache_name: str, dtype: Optional[Dict[str, str]] = None, refresh: bool = False) -> pd.DataFrame:
+    """Fetch CSV with naive caching (parsed frames in memory, raw CSV + Parquet sidecar on disk).
+
+    Once the disk copy is older than CACHE_TTL_HOURS it is revalidated with a conditional GET,
+    so an unchanged upstream file is not downloaded again.
+    If dtype is given, only those columns are parsed, with those dtypes.
+    Returned frames are shared between callers and must not be mutated in place.
+    """
+    if not refresh:
+        hit = _DF_CACHE.get(url)
+        if hit is not None and time.time() - hit[0] < _DF_TTL:
+            return hit[1]
     cache_path = os.path.join(CACHE_DIR, cache_name)
+    have_cache = os.path.exists(cache_path)
     use_cache = False
-    if os.path.exists(cache_path):
+    if not refresh and have_cache:
         age_hours = (time.time() - os.path.getmtime(cache_path)) / 3600
         if age_hours < CACHE_TTL_HOURS:
             use_cache = True
     if use_cache:
-        return pd.read_csv(cache_path)
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        with open(cache_path, "wb") as f:
-            f.write(r.content)
-        return pd.read_csv(io.BytesIO(r.content))
+        df = _read_cached(cache_path, dtype)
+    else:
+        headers = {}
+        if have_cache:
+            validators = _read_validators(cache_path)
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        r = await _HTTP.get(url, headers=headers)
+        if r.status_code == 304:
+            # Unchanged upstream: restart the TTL and keep using the disk copy
+            now = time.time()
+            os.utime(cache_path, (now, now))
+            parquet_path = _parquet_path(cache_path, dtype)
+            if os.path.exists(parquet_path):
+                os.utime(parquet_path, (now, now))
+            df = _read_cached(cache_path, dtype)
+        else:
+            r.raise_for_status()
+            with open(cache_path, "wb") as f:
+                f.write(r.content)
+            df = _parse_csv(io.BytesIO(r.content), dtype)
+            _write_parquet(df, cache_path, dtype)
+            _write_validators(cache_path, r.headers)
+    _DF_CACHE[url] = (time.time(), df)
+    return df
 
 async def load_player_stats() -> pd.DataFrame:
-    return await fetch_csv(PLAYER_STATS_URL, f"player_stats_{SEASON}.csv")
+    return await fetch_csv(PLAYER_STATS_URL, f"player_stats_{SEASON}.csv", PLAYER_STATS_DTYPES)
 
 async def load_snap_counts() -> pd.DataFrame:
-    return await fetch_csv(SNAP_COUNTS_URL, f"snap_counts_{SEASON}.csv")
+    return await fetch_csv(SNAP_COUNTS_URL, f"snap_counts_{SEASON}.csv", SNAP_COUNTS_DTYPES)
 
 async def load_players_map() -> pd.DataFrame:
-    return await fetch_csv(PLAYERS_URL, f"players_all.csv")
-
-def fantasy_points(row: pd.Series, scoring: Dict[str, float]) -> float:
-    pts = 0.0
-    g = lambda k: float(row.get(k, 0) or 0)
-    pts += g("receptions") * scoring["receptions"]
-    pts += g("passing_yards") * scoring["pass_yd"]
-    pts += g("passing_tds") * scoring["pass_td"]
-    pts += g("interceptions") * scoring["int"]
-    pts += g("rushing_yards") * scoring["rush_yd"]
-    pts += g("rushing_tds") * scoring["rush_td"]
-    pts += g("receiving_yards") * scoring["rec_yd"]
-    pts += g("receiving_tds") * scoring["rec_td"]
-    pts += g("fumbles_lost") * scoring["fumbles_lost"]
-    return round(pts, 2)
-
-async def compute_ppg(player_name: str, start_week: int, end_week: int, min_snap_pct: float, scoring_key: str) -> Tuple[float, int]:
+    return await fetch_csv(PLAYERS_URL, f"players_all.csv", PLAYERS_DTYPES)
+
+def fantasy_points(df: pd.DataFrame, presets: Dict[str, Dict[str, float]]) -> np.ndarray:
     """
-    Returns (ppg, n_games_qualified)
+    Fantasy points for every row of df under each preset, as an (n_rows, n_presets) array
+    with columns in presets order. Stats are stored as float32 but packed into one float64
+    matrix and scored with a single matrix product, so PPG ties round like the per-row
+    formula did. Stat columns must already be numeric without NaNs
+    (see build_season_frame); absent ones count as zero.
     """
-    scoring = SCORING_PRESETS[scoring_key]
-    stats = await load_player_stats()
-    snaps = await load_snap_counts()
-    players = await load_players_map()
-
-    stats = stats[(stats["season"] == SEASON) & (stats["season_type"] == "REG")]
-    stats = stats[(stats["week"] >= start_week) & (stats["week"] <= end_week)]
-
-    mask = stats["player_name"].str.lower().str.contains(player_name.lower())
-    cand = stats[mask].copy()
-    if cand.empty:
-        return (0.0, 0)
-
-    players_small = players[["gsis_id", "display_name", "pfr_id"]].rename(
-        columns={"display_name": "player_name_map"}
+    zeros = np.zeros(len(df), dtype="float64")
+    stats = np.column_stack([
+        df[c].to_numpy(dtype="float64") if c in df.columns else zeros for c in FP_STAT_COLUMNS
+    ])
+    weights = np.array(
+        [[scoring[key] for scoring in presets.values()] for key in FP_STAT_KEYS.values()],
+        dtype="float64"
     )
-    cand = cand.merge(players_small, left_on="player_id", right_on="gsis_id", how="left")
+    # Per-game points are rounded to 2 decimals, as the per-row formula did
+    return np.round(stats @ weights, 2)
 
-    snaps_small = snaps[["season", "week", "team", "player", "pfr_player_id", "offense_pct"]].copy()
+async def build_season_frame() -> pd.DataFrame:
+    """
+    Regular-season weekly stats for SEASON joined with each game's offensive snap%.
+    Build once per command and pass to compute_ppg for every player.
+    """
+    if bot.players_map is None:
+        bot.players_map = await load_players_map()
+    players = bot.players_map
+    stats, snaps = await asyncio.gather(load_player_stats(), load_snap_counts())
 
-    joined = cand.merge(
-        snaps_small,
-        left_on=["season", "week", "team", "pfr_id"],
-        right_on=["season", "week", "team", "pfr_player_id"],
-        how="left"
-    )
+    stats = stats[(stats["season"] == SEASON) & (stats["season_type"] == "REG")]
 
-    missing = joined["offense_pct"].isna()
-    if missing.any():
-        fallback = cand[missing].merge(
-            snaps_small,
-            left_on=["season", "week", "team", "player_name"],
-            right_on=["season", "week", "team", "player"],
-            how="left"
-        )
-        joined.loc[missing, "offense_pct"] = fallback["offense_pct"].values
+    pfr_by_gsis = players.dropna(subset=["gsis_id"]).drop_duplicates("gsis_id").set_index("gsis_id")["pfr_id"]
+    pfr_ids = stats["player_id"].map(pfr_by_gsis)
 
-    joined["offense_pct"] = joined["offense_pct"].fillna(0.0)
-    qualified = joined[joined["offense_pct"] >= float(min_snap_pct)].copy()
-    if qualified.empty:
+    # (season, week, team, pfr id) and (season, week, team, name) -> offense_pct
+    with_pfr = snaps.dropna(subset=["pfr_player_id"])
+    snaps_by_pfr = dict(zip(
+        zip(with_pfr["season"], with_pfr["week"], with_pfr["team"], with_pfr["pfr_player_id"]),
+        with_pfr["offense_pct"]
+    ))
+    snaps_by_name = dict(zip(zip(snaps["season"], snaps["week"], snaps["team"], snaps["player"]), snaps["offense_pct"]))
+
+    pfr_keys = pd.Series(list(zip(stats["season"], stats["week"], stats["team"], pfr_ids)), index=stats.index, dtype=object)
+    name_keys = pd.Series(list(zip(stats["season"], stats["week"], stats["team"], stats["player_name"])), index=stats.index, dtype=object)
+    offense_pct = pfr_keys.map(snaps_by_pfr).fillna(name_keys.map(snaps_by_name)).fillna(0.0)
+
+    # fillna returns a new frame (stats is a filtered slice of a cached one), so the
+    # derived columns below can be added to it directly without an extra .copy()
+    frame = stats.fillna({c: 0.0 for c in FP_STAT_COLUMNS if c in stats.columns})
+    frame["offense_pct"] = offense_pct.to_numpy(dtype="float32")
+    # Only a few presets, so score every row under each one up front
+    fp = fantasy_points(frame, SCORING_PRESETS)
+    for i, key in enumerate(SCORING_PRESETS):
+        frame[f"fp_{key}"] = fp[:, i]
+    # Lowercased once (as a categorical, so name matches compare codes) for every compute_ppg call
+    frame["_name_lc"] = frame["player_name"].str.lower().astype("category")
+    return frame
+
+def compute_ppg(frame: pd.DataFrame, player_name: str, start_week: int, end_week: int, min_snap_pct: float, scoring_key: str) -> Tuple[float, int]:
+    """
+    Returns (ppg, n_games_qualified) using a frame from build_season_frame().
+    """
+    name_lc = player_name.lower()
+    name_mask = (frame["_name_lc"] == name_lc).to_numpy(dtype=bool, na_value=False)
+    if not name_mask.any():
+        name_mask = frame["_name_lc"].str.contains(name_lc, regex=False).to_numpy(dtype=bool, na_value=False)
+    mask = (
+        name_mask
+        & (frame["week"] >= start_week)
+        & (frame["week"] <= end_week)
+        & (frame["offense_pct"] >= float(min_snap_pct))
+    )
+    fp = frame.loc[mask, f"fp_{scoring_key}"]
+    if fp.empty:
         return (0.0, 0)
-
-    qualified["fp"] = qualified.apply(lambda r: fantasy_points(r, scoring), axis=1)
-    ppg = qualified["fp"].mean()
-    n = qualified.shape[0]
-    return (round(ppg, 2), int(n))
+    return (float(np.round(fp.mean(), 2)), int(fp.size))
 
 def fmt_ppg(ppg: float, n: int) -> str:
     return f"{ppg:.2f} PPG over {n} qualifying game{'s' if n!=1 else ''}"
@@ -227,11 +401,8 @@ async def close_completed_bets():
     max_week = await get_current_max_week()
     if max_week <= 0:
         return
-    con = sqlite3.connect(DB)
-    cur = con.cursor()
-    cur.execute("UPDATE bets SET is_active=0 WHERE season=? AND is_active=1 AND end_week<=?", (SEASON, max_week))
-    con.commit()
-    con.close()
+    with db_write() as con:
+        con.execute("UPDATE bets SET is_active=0 WHERE season=? AND is_active=1 AND end_week<=?", (SEASON, max_week))
 
 def user_can_edit(interaction: discord.Interaction, creator_id: str) -> bool:
     if str(interaction.user.id) == creator_id:
@@ -286,27 +457,25 @@ async def addbet(
     participant_ids = _collect_participant_ids(participant1, participant2, participant3, participant4, participant5, participant6)
     participant_ids_str = ",".join(participant_ids)
 
-    con = sqlite3.connect(DB)
-    cur = con.cursor()
-    cur.execute("""
-        INSERT INTO bets(creator_discord_id, player_a, player_b, description, scoring, min_snap_pct, season, start_week, end_week, participants, is_active, created_at)
-        VALUES(?,?,?,?,?,?,?,?,?,?,1,?)
-    """, (
-        str(interaction.user.id),
-        player_a.strip(),
-        player_b.strip(),
-        description.strip(),
-        scoring,
-        float(min_snap_pct),
-        SEASON,
-        start_week,
-        end_week,
-        participant_ids_str,
-        dt.datetime.now(TZ).isoformat()
-    ))
-    con.commit()
-    bet_id = cur.lastrowid
-    con.close()
+    with db_write() as con:
+        cur = con.cursor()
+        cur.execute("""
+            INSERT INTO bets(creator_discord_id, player_a, player_b, description, scoring, min_snap_pct, season, start_week, end_week, participants, is_active, created_at)
+            VALUES(?,?,?,?,?,?,?,?,?,?,1,?)
+        """, (
+            str(interaction.user.id),
+            player_a.strip(),
+            player_b.strip(),
+            description.strip(),
+            scoring,
+            float(min_snap_pct),
+            SEASON,
+            start_week,
+            end_week,
+            participant_ids_str,
+            dt.datetime.now(TZ).isoformat()
+        ))
+        bet_id = cur.lastrowid
 
     mention_str = " ".join(f"<@{uid}>" for uid in participant_ids) if participant_ids else "None tagged"
     await interaction.response.send_message(
@@ -350,17 +519,13 @@ async def editbet(
     participant6: Optional[discord.User] = None,
     clear_participants: Optional[bool] = False
 ):
-    con = sqlite3.connect(DB)
-    cur = con.cursor()
-    cur.execute("SELECT creator_discord_id, is_active FROM bets WHERE id=?", (bet_id,))
-    row = cur.fetchone()
+    with _LOCK:
+        row = _CON.execute("SELECT creator_discord_id, is_active FROM bets WHERE id=?", (bet_id,)).fetchone()
     if not row:
-        con.close()
         await interaction.response.send_message("Bet not found.", ephemeral=True)
         return
     creator_id, is_active = row
     if not user_can_edit(interaction, creator_id):
-        con.close()
         await interaction.response.send_message("You don't have permission to edit this bet.", ephemeral=True)
         return
 
@@ -375,14 +540,12 @@ async def editbet(
     if scoring:
         scoring = scoring.upper()
         if scoring not in SCORING_PRESETS:
-            con.close()
             await interaction.response.send_message("Scoring must be one of: PPR, HALF, STD", ephemeral=True)
             return
         updates.append("scoring=?"); params.append(scoring)
 
     if min_snap_pct is not None:
         if not (0 <= float(min_snap_pct) <= 100):
-            con.close()
             await interaction.response.send_message("min_snap_pct must be between 0 and 100", ephemeral=True)
             return
         updates.append("min_snap_pct=?"); params.append(float(min_snap_pct))
@@ -409,14 +572,12 @@ async def editbet(
         updates.append("participants=?"); params.append(participants_str)
 
     if not updates:
-        con.close()
         await interaction.response.send_message("Nothing to update. Provide at least one field.", ephemeral=True)
         return
 
     params.append(bet_id)
-    cur.execute(f"UPDATE bets SET {', '.join(updates)} WHERE id=?", params)
-    con.commit()
-    con.close()
+    with db_write() as con:
+        con.execute(f"UPDATE bets SET {', '.join(updates)} WHERE id=?", params)
 
     await interaction.response.send_message(f"✅ Bet #{bet_id} updated.")
 
@@ -426,22 +587,20 @@ async def standings(interaction: discord.Interaction):
     await close_completed_bets()
     max_week = await get_current_max_week()
 
-    con = sqlite3.connect(DB)
-    cur = con.cursor()
-    cur.execute("SELECT id, player_a, player_b, scoring, min_snap_pct, start_week, end_week, description, participants FROM bets WHERE is_active=1 AND season=?", (SEASON,))
-    rows = cur.fetchall()
-    con.close()
+    with _LOCK:
+        rows = _CON.execute("SELECT id, player_a, player_b, scoring, min_snap_pct, start_week, end_week, description, participants FROM bets WHERE is_active=1 AND season=?", (SEASON,)).fetchall()
 
     if not rows:
         await interaction.followup.send("No active bets yet. Use `/addbet` to create one!")
         return
 
+    frame = await build_season_frame()
     lines = []
     for (bid, a, b, scoring, minpct, s, e, desc, participants_str) in rows:
         # Clamp computation to available published weeks
         end_w = min(e, max_week if max_week > 0 else e)
-        a_ppg, a_n = await compute_ppg(a, s, end_w, minpct, scoring)
-        b_ppg, b_n = await compute_ppg(b, s, end_w, minpct, scoring)
+        a_ppg, a_n = compute_ppg(frame, a, s, end_w, minpct, scoring)
+        b_ppg, b_n = compute_ppg(frame, b, s, end_w, minpct, scoring)
         leader = "TIED"
         if a_ppg > b_ppg: leader = f"{a} ↑"
         elif b_ppg > a_ppg: leader = f"{b} ↑"
@@ -465,11 +624,8 @@ async def standings(interaction: discord.Interaction):
 
 @bot.tree.command(name="mybets", description="List the bets you created")
 async def mybets(interaction: discord.Interaction):
-    con = sqlite3.connect(DB)
-    cur = con.cursor()
-    cur.execute("SELECT id, player_a, player_b, scoring, min_snap_pct, start_week, end_week, description, participants, is_active FROM bets WHERE creator_discord_id=? AND season=?", (str(interaction.user.id), SEASON))
-    rows = cur.fetchall()
-    con.close()
+    with _LOCK:
+        rows = _CON.execute("SELECT id, player_a, player_b, scoring, min_snap_pct, start_week, end_week, description, participants, is_active FROM bets WHERE creator_discord_id=? AND season=?", (str(interaction.user.id), SEASON)).fetchall()
     if not rows:
         await interaction.response.send_message("You don’t have any bets.", ephemeral=True)
         return
@@ -489,52 +645,50 @@ def next_run_datetime() -> dt.datetime:
         candidate += dt.timedelta(days=7)
     return candidate
 
-@tasks.loop(seconds=60)
-async def weekly_job():
-    now = dt.datetime.now(TZ)
-    target = weekly_job.next_target
-    if abs((now - target).total_seconds()) <= 30:
-        try:
-            # Close completed bets before posting
-            await close_completed_bets()
-            max_week = await get_current_max_week()
-            channel = bot.get_channel(WEEKLY_CHANNEL_ID)
-            if channel is not None:
-                con = sqlite3.connect(DB)
-                cur = con.cursor()
-                cur.execute("SELECT id, player_a, player_b, scoring, min_snap_pct, start_week, end_week, description, participants, is_active FROM bets WHERE season=?", (SEASON,))
-                rows = cur.fetchall()
-                con.close()
-                if not rows:
-                    await channel.send("No bets yet. Use `/addbet` to create one!")
-                else:
-                    lines = []
-                    for (bid, a, b, scoring, minpct, s, e, desc, participants_str, is_active) in rows:
-                        end_w = min(e, max_week if max_week > 0 else e)
-                        a_ppg, a_n = await compute_ppg(a, s, end_w, minpct, scoring)
-                        b_ppg, b_n = await compute_ppg(b, s, end_w, minpct, scoring)
-                        leader = "TIED"
-                        delta = round(a_ppg - b_ppg, 2)
-                        if a_ppg > b_ppg: leader = f"{a} by {abs(delta):.2f}"
-                        elif b_ppg > a_ppg: leader = f"{b} by {abs(delta):.2f}"
-                        parts = " ".join(f"<@{uid}>" for uid in (participants_str or "").split(",") if uid)
-                        status = "ACTIVE" if is_active else "CLOSED"
-                        lines.append(f"**#{bid}** [{status}] {a} vs {b}: {leader} — {scoring}, ≥{minpct}% snaps (W{s}-{e}) • {parts if parts else ''}")
-                    embed = discord.Embed(
-                        title=f"Weekly Bet Standings — {SEASON} (Through Week {max_week if max_week>0 else '—'})",
-                        description="\n".join(lines[:20]),
-                        color=discord.Color.green()
-                    )
-                    await channel.send(embed=embed)
-        finally:
-            weekly_job.next_target = next_run_datetime()
-
-@weekly_job.before_loop
-async def before_weekly():
+async def do_weekly_post():
+    # Close completed bets before posting
+    await close_completed_bets()
+    max_week = await get_current_max_week()
+    channel = bot.get_channel(WEEKLY_CHANNEL_ID)
+    if channel is not None:
+        with _LOCK:
+            rows = _CON.execute("SELECT id, player_a, player_b, scoring, min_snap_pct, start_week, end_week, description, participants, is_active FROM bets WHERE season=?", (SEASON,)).fetchall()
+        if not rows:
+            await channel.send("No bets yet. Use `/addbet` to create one!")
+        else:
+            frame = await build_season_frame()
+            lines = []
+            for (bid, a, b, scoring, minpct, s, e, desc, participants_str, is_active) in rows:
+                end_w = min(e, max_week if max_week > 0 else e)
+                a_ppg, a_n = compute_ppg(frame, a, s, end_w, minpct, scoring)
+                b_ppg, b_n = compute_ppg(frame, b, s, end_w, minpct, scoring)
+                leader = "TIED"
+                delta = round(a_ppg - b_ppg, 2)
+                if a_ppg > b_ppg: leader = f"{a} by {abs(delta):.2f}"
+                elif b_ppg > a_ppg: leader = f"{b} by {abs(delta):.2f}"
+                parts = " ".join(f"<@{uid}>" for uid in (participants_str or "").split(",") if uid)
+                status = "ACTIVE" if is_active else "CLOSED"
+                lines.append(f"**#{bid}** [{status}] {a} vs {b}: {leader} — {scoring}, ≥{minpct}% snaps (W{s}-{e}) • {parts if parts else ''}")
+            embed = discord.Embed(
+                title=f"Weekly Bet Standings — {SEASON} (Through Week {max_week if max_week>0 else '—'})",
+                description="\n".join(lines[:20]),
+                color=discord.Color.green()
+            )
+            await channel.send(embed=embed)
+
+async def weekly_runner():
+    """Sleep until each scheduled post time instead of polling."""
     await bot.wait_until_ready()
-    weekly_job.next_target = next_run_datetime()
+    while not bot.is_closed():
+        target = next_run_datetime()
+        await asyncio.sleep((target - dt.datetime.now(TZ)).total_seconds())
+        if dt.datetime.now(TZ) < target:
+            continue  # woke early (e.g. clock adjustment); sleep the remainder
+        try:
+            await do_weekly_post()
+        except Exception:
+            traceback.print_exc()
 
 # ========= RUN =========
 if __name__ == "__main__":
-    weekly_job.start()
     bot.run(DISCORD_TOKEN)